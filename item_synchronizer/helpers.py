@@ -1,11 +1,17 @@
 """Helper functions and classes"""
-from dataclasses import dataclass, field
-from typing import MutableMapping, Set
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
 
-from item_synchronizer.types import ID, DeleterFn, ItemGetterFn
+from item_synchronizer.types import ID, Item, ItemGetterFn
 
+# Flags describing how an item changed on one side - see SideChanges.as_flags
+NEW = 1
+MODIFIED = 2
+DELETED = 4
+TOUCHED = MODIFIED | DELETED
 
-@dataclass
+
+@dataclass(init=False)
 class SideChanges:
     """Hold the items that are new, modified or deleted compared to the previous run.
 
@@ -14,49 +20,97 @@ class SideChanges:
     to do so
     """
 
-    new: Set[ID] = field(default_factory=set)
-    modified: Set[ID] = field(default_factory=set)
-    deleted: Set[ID] = field(default_factory=set)
+    __slots__ = ("new", "modified", "deleted")
+
+    new: Set[ID]
+    modified: Set[ID]
+    deleted: Set[ID]
+
+    def __init__(
+        self,
+        new: Optional[Set[ID]] = None,
+        modified: Optional[Set[ID]] = None,
+        deleted: Optional[Set[ID]] = None,
+    ):
+        self.new = set() if new is None else new
+        self.modified = set() if modified is None else modified
+        self.deleted = set() if deleted is None else deleted
+
+    def __bool__(self) -> bool:
+        """True if there's at least one change."""
+        return bool(self.new or self.modified or self.deleted)
+
+    def as_flags(self) -> Dict[ID, int]:
+        """Map each changed ID to a bitmask of the NEW, MODIFIED and DELETED flags."""
+        flags: Dict[ID, int] = {}
+        get = flags.get
+        for ids, flag in ((self.new, NEW), (self.modified, MODIFIED), (self.deleted, DELETED)):
+            for id_ in ids:
+                flags[id_] = get(id_, 0) | flag
+        return flags
 
     def __str__(self) -> str:
-        s = f"New Items:      {len(self.new)}\n\t"
-        s += "\n\t".join(id_ for id_ in self.new)
-        s = s.rstrip("\n\t")
-        s += f"\nModified Items: {len(self.modified)}\n\t"
-        s += "\n\t".join(id_ for id_ in self.modified)
-        s = s.rstrip("\n\t")
-        s += f"\nDeleted Item:   {len(self.deleted)}\n\t"
-        s += "\n\t".join(id_ for id_ in self.deleted)
-        s = s.rstrip("\t")
-        return s
+        parts: List[str] = []
+        append = parts.append
+        for title, ids in (
+            ("New Items:      ", self.new),
+            ("\nModified Items: ", self.modified),
+            ("\nDeleted Item:   ", self.deleted),
+        ):
+            append(f"{title}{len(ids)}")
+            if ids:
+                append("\n\t")
+                append("\n\t".join(ids))
 
+        return "".join(parts)
 
-def item_getter_handle_exc(item_getter: ItemGetterFn) -> ItemGetterFn:
-    """ItemGetter decorator function that handles exception when handing over the item."""
 
-    def fn(*args, **kargs):
+class _ItemGetterHandleExc:
+    """Item getter that returns None if the item is not there anymore."""
+
+    __slots__ = ("__wrapped__",)
+
+    def __init__(self, item_getter: ItemGetterFn):
+        self.__wrapped__ = item_getter
+
+    def __call__(self, id_: ID) -> Item:
         try:
-            return item_getter(*args, **kargs)
+            return self.__wrapped__(id_)
         except KeyError:
             return None
 
-    return fn
 
+class _ReportSuccess:
+    """Callable that returns True if the wrapped callable returns without raising."""
 
-def delete_n_pop(deleter: DeleterFn, map_: MutableMapping) -> DeleterFn:
-    """Wrapper function for deleting and popping an item from the given map mapping."""
-    delete_n_pop.__doc__ = deleter.__doc__
+    __slots__ = ("__wrapped__",)
 
-    def fn(id_):
-        deleter(id_)
-        map_.pop(id_)
+    def __init__(self, fn: Callable[..., Any]):
+        self.__wrapped__ = fn
 
-    return fn
+    def __call__(self, *args, **kargs) -> bool:
+        self.__wrapped__(*args, **kargs)
+        return True
+
+
+def item_getter_handle_exc(item_getter: ItemGetterFn) -> ItemGetterFn:
+    """ItemGetter decorator function that handles exception when handing over the item."""
+    return _ItemGetterHandleExc(item_getter)
+
+
+def report_success(fn: Callable[..., Any]) -> Callable[..., bool]:
+    """Decorator function that makes the given function return True once it succeeds.
+
+    Meant to be combined with a decorator that swallows exceptions and returns None instead.
+    """
+    return _ReportSuccess(fn)
 
 
 class TypeStats:
     """Container class for printing execution stats on exit - per type."""
 
+    __slots__ = ("_title", "_created_new", "_updated", "_deleted", "_errors", "_sep")
+
     def __init__(self, title: str):
         self._title = title
 
@@ -83,6 +137,10 @@ class TypeStats:
         """Report an error during an event operation."""
         self._errors += 1
 
+    def __bool__(self) -> bool:
+        """True if at least one event has been reported."""
+        return bool(self._created_new or self._updated or self._deleted or self._errors)
+
     def __str__(self) -> str:
         s = (
             f"{self._title}\n"
@@ -90,5 +148,6 @@ class TypeStats:
             f"\t* Items created: {self._created_new}\n"
             f"\t* Items updated: {self._updated}\n"
             f"\t* Items deleted: {self._deleted}\n"
+            f"\t* Items with errors: {self._errors}\n"
         )
         return s
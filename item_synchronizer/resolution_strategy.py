@@ -1,30 +1,28 @@
 """Home of the various resolution strategy classes."""
 from abc import ABC, abstractmethod
 from datetime import datetime
-from enum import Enum
-from typing import Callable
+from enum import IntEnum
+from operator import ge, le
+from typing import Callable, List, Sequence
 
 from item_synchronizer.types import DateGetterFn, Item
 
 
-def _named(cls):
-    cls.name = cls.__name__
-    return cls
-
-
 class ResolutionResult:
     """Result of a resolution.
 
     None signifise that the item is resolved to "Deleted"
     """
 
-    class ID(Enum):
+    class ID(IntEnum):
         """Represents the ID of the item chosen from the corresponding resolution."""
 
         A = 0
         B = 1
         Mix = 2
 
+    __slots__ = ("_id", "_item")
+
     def __init__(self, id: ID, item: Item):  # pylint: disable=W0622
         self._id = id
         self._item = item
@@ -40,9 +38,26 @@ class ResolutionResult:
         return self._item
 
 
+# module-level aliases - avoid the class -> Enum -> member lookup chain in the resolve() paths
+_ID_A = ResolutionResult.ID.A
+_ID_B = ResolutionResult.ID.B
+
+# ResolutionResult is never mutated after construction, so the results that don't carry an
+# actual item can be shared.
+_RESULT_A_NONE = ResolutionResult(id=_ID_A, item=None)
+_RESULT_B_NONE = ResolutionResult(id=_ID_B, item=None)
+
+
 class ResolutionStrategy(ABC):
     """Base class for all the resolution strategies."""
 
+    # name of the derived resolution strategy - set once, on subclass creation
+    name: str = "ResolutionStrategy"
+
+    def __init_subclass__(cls, **kargs):
+        super().__init_subclass__(**kargs)
+        cls.name = cls.__name__
+
     def __init__(self, *args, **kargs):
         """
         Implementations of this should accept whatever arguments they require for the resolve
@@ -66,11 +81,17 @@ class ResolutionStrategy(ABC):
         """
         raise NotImplementedError()
 
-    @property
-    @classmethod
-    def name(cls) -> str:
-        """Get the name of the derived resolution strategy."""
-        raise NotImplementedError
+    def resolve_batch(
+        self, items_A: Sequence[Item], items_B: Sequence[Item]
+    ) -> List[ResolutionResult]:
+        """
+        Resolve the conflicts between each pair of items of the two given sequences.
+
+        Implementations can override this to amortize the per-conflict overhead, by default it
+        calls resolve() on each one of the pairs.
+        """
+        resolve = self.resolve
+        return [resolve(item_A, item_B) for item_A, item_B in zip(items_A, items_B)]
 
 
 class RecencyRS(ResolutionStrategy):
@@ -99,23 +120,30 @@ class RecencyRS(ResolutionStrategy):
 
         super().__init__(*args, **kargs)
 
-    def resolve(self, item_A: Item, item_B: Item) -> ResolutionResult:
-        # handle None(s) ----------------------------------------------------------------------
+    @staticmethod
+    def _handle_none(item_A: Item, item_B: Item) -> ResolutionResult:
+        """Resolve a conflict in which at least one of the items was deleted."""
         if item_A is None and item_B is None:
-            return ResolutionResult(id=ResolutionResult.ID.A, item=item_A)
+            return _RESULT_A_NONE
         if item_A is None:
-            return ResolutionResult(id=ResolutionResult.ID.B, item=item_B)
-        if item_B is None:
-            return ResolutionResult(id=ResolutionResult.ID.A, item=item_A)
+            return ResolutionResult(id=_ID_B, item=item_B)
+        return ResolutionResult(id=_ID_A, item=item_A)
+
+    def resolve(self, item_A: Item, item_B: Item) -> ResolutionResult:
+        # deletions are rare - get them out of the way with a single check
+        if item_A is None or item_B is None:
+            return self._handle_none(item_A, item_B)
 
         # both have dates
-        if self._compare_dates(self._date_getter_A(item_A), self._date_getter_B(item_B)):
-            return ResolutionResult(id=ResolutionResult.ID.A, item=item_A)
+        compare_dates = self._compare_dates
+        date_getter_A = self._date_getter_A
+        date_getter_B = self._date_getter_B
+        if compare_dates(date_getter_A(item_A), date_getter_B(item_B)):
+            return ResolutionResult(id=_ID_A, item=item_A)
         else:
-            return ResolutionResult(id=ResolutionResult.ID.B, item=item_B)
+            return ResolutionResult(id=_ID_B, item=item_B)
 
 
-@_named
 class MostRecentRS(RecencyRS):
     """Return the most recent item."""
 
@@ -127,11 +155,10 @@ class MostRecentRS(RecencyRS):
         super().__init__(
             date_getter_A=date_getter_A,
             date_getter_B=date_getter_B,
-            compare_dates=lambda date1, date2: date1 >= date2,
+            compare_dates=ge,
         )
 
 
-@_named
 class LeastRecentRS(RecencyRS):
     """Return the oldest item."""
 
@@ -143,24 +170,26 @@ class LeastRecentRS(RecencyRS):
         super().__init__(
             date_getter_A=date_getter_A,
             date_getter_B=date_getter_B,
-            compare_dates=lambda date1, date2: date1 <= date2,
+            compare_dates=le,
         )
 
 
-@_named
 class AlwaysFirstRS(ResolutionStrategy):
     """Return the first item."""
 
     def resolve(self, item_A: Item, item_B: Item) -> ResolutionResult:
-        return ResolutionResult(id=ResolutionResult.ID.A, item=item_A)
+        if item_A is None:
+            return _RESULT_A_NONE
+        return ResolutionResult(id=_ID_A, item=item_A)
 
 
-@_named
 class AlwaysSecondRS(ResolutionStrategy):
     """Return the second item."""
 
     def resolve(self, item_A: Item, item_B: Item) -> ResolutionResult:
-        return ResolutionResult(id=ResolutionResult.ID.B, item=item_B)
+        if item_B is None:
+            return _RESULT_B_NONE
+        return ResolutionResult(id=_ID_B, item=item_B)
 
 
 all_resolution_strategies = [AlwaysFirstRS, AlwaysSecondRS, MostRecentRS, LeastRecentRS]
@@ -1,6 +1,8 @@
 """House of the bi-directional Synchronizer class."""
 
-from typing import Any, Callable, Literal, Optional, Tuple, TypeVar, cast
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
 
 from bidict import MutableBidict  # type: ignore
 
@@ -8,10 +10,13 @@ from bidict import MutableBidict  # type: ignore
 from bubop import logger  # type: ignore
 
 from item_synchronizer.helpers import (
+    DELETED,
+    MODIFIED,
+    TOUCHED,
     SideChanges,
     TypeStats,
-    delete_n_pop,
     item_getter_handle_exc,
+    report_success,
 )
 from item_synchronizer.resolution_strategy import ResolutionResult, ResolutionStrategy
 from item_synchronizer.types import (
@@ -25,6 +30,13 @@ from item_synchronizer.types import (
 )
 
 _FuncT = TypeVar("_FuncT", bound=Callable[..., Any])
+# item getter of the source side, converter, inserter and stats of the destination side
+_InsertPack = Tuple[ItemGetterFn, ConverterFn, InserterFn, TypeStats]
+# converter and updater of the side to update - the updater returns True on success
+_UpdatePack = Tuple[ConverterFn, Callable[[ID, Item], Optional[bool]]]
+# function to run, its arguments and what to do in case it succeeds or fails - the function
+# reports success by returning a truthy value
+_Job = Tuple[Callable[..., Optional[bool]], tuple, Callable[[], Any], Callable[[], Any]]
 
 
 class Synchronizer:  # pylint: disable="R0903,R0902"
@@ -37,6 +49,10 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
     These "items" may range from Calendar entries, TODO task lists, or whatever else you want
     as long as the user registers the appropriate functions/methods to convert from one said
     item to another.
+
+    Updates and deletions that don't conflict with a change on the other side can be run
+    concurrently by setting max_workers to more than 1. In that case the updater, deleter,
+    converter and item getter functions must be safe to call from multiple threads.
     """
 
     def __init__(
@@ -56,17 +72,21 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
         resolution_strategy: ResolutionStrategy,
         catch_exceptions: bool,
         side_names: Tuple[str, str] = ("A Side", "B Side"),
+        max_workers: int = 1,
     ):
         self._catch_exceptions = catch_exceptions
+        self._max_workers = max_workers
 
         self._A_to_B: MutableBidict = A_to_B
         self._B_to_A: MutableBidict = A_to_B.inverse
         self._inserter_to_A = self._decide_catch_exc(inserter_to_A)
         self._inserter_to_B = self._decide_catch_exc(inserter_to_B)
-        self._updater_to_A = self._decide_catch_exc(updater_to_A)
-        self._updater_to_B = self._decide_catch_exc(updater_to_B)
-        self._deleter_to_A = self._decide_catch_exc(delete_n_pop(deleter_to_A, self._A_to_B))
-        self._deleter_to_B = self._decide_catch_exc(delete_n_pop(deleter_to_B, self._B_to_A))
+        # the updaters and deleters return True on success - it's up to the caller to update
+        # the mapping and the stats
+        self._updater_to_A = self._decide_catch_exc(report_success(updater_to_A))
+        self._updater_to_B = self._decide_catch_exc(report_success(updater_to_B))
+        self._deleter_to_A = self._decide_catch_exc(report_success(deleter_to_A))
+        self._deleter_to_B = self._decide_catch_exc(report_success(deleter_to_B))
         self._converter_to_A = self._decide_catch_exc(converter_to_A)
         self._converter_to_B = self._decide_catch_exc(converter_to_B)
         self._item_getter_A = item_getter_handle_exc(item_getter_A)
@@ -74,72 +94,132 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
         self._rs = resolution_strategy
         self._stats = tuple(TypeStats(name) for name in side_names)
 
+        # everything needed for inserting an item to each one of the sides
+        self._side_A_pack: _InsertPack = (
+            self._item_getter_B,
+            self._converter_to_A,
+            self._inserter_to_A,
+            self._stats[0],
+        )
+        self._side_B_pack: _InsertPack = (
+            self._item_getter_A,
+            self._converter_to_B,
+            self._inserter_to_B,
+            self._stats[1],
+        )
+
+        # everything needed for updating an item of each one of the sides
+        self._update_packs: Tuple[_UpdatePack, _UpdatePack] = (
+            (self._converter_to_A, self._updater_to_A),
+            (self._converter_to_B, self._updater_to_B),
+        )
+
     def _decide_catch_exc(self, fn: _FuncT) -> _FuncT:
         """Run the decorated function and catch all exceptions."""
         if not self._catch_exceptions:
             return fn
 
+        # compute the description once, at decoration time, instead of on every failure. Use
+        # the docstring of the user-provided function, not that of our own wrappers around it.
+        described = getattr(fn, "__wrapped__", fn)
+        if described.__doc__:
+            desc = described.__doc__.split("\n", 1)[0].strip().rstrip(".")
+        else:
+            desc = repr(described)
+        msg = f"[{desc}] Operation failed."
+
         def wrapper(*args, **kargs):
             try:
                 return fn(*args, **kargs)
-            except Exception as exc:  # pylint: disable="W0703"
-                if isinstance(exc, KeyboardInterrupt):
-                    raise
-
-                if fn.__doc__ is not None:
-                    desc = fn.__doc__.split("\n")[0].strip().rstrip(".")
-                else:
-                    desc = str(fn)
-                logger.error(f"[{desc}] Operation failed.")
-                logger.opt(exception=True).debug(f"[{desc}] Operation failed.")
+            except Exception:  # pylint: disable="W0703"
+                logger.opt(exception=True).error(msg)
                 return None
 
         return cast(_FuncT, wrapper)
 
-    def _convert_n_insert(self, id_: ID, insert_to_side: Literal["A", "B"]) -> Optional[ID]:
-        if insert_to_side == "A":
-            item_getter = self._item_getter_B
-            converter = self._converter_to_A
-            inserter = self._inserter_to_A
-        elif insert_to_side == "B":
-            item_getter = self._item_getter_A
-            converter = self._converter_to_B
-            inserter = self._inserter_to_B
-        else:
-            raise RuntimeError()
+    def _convert_n_insert(self, id_: ID, pack: _InsertPack) -> Optional[ID]:
+        item_getter, converter, inserter, stats = pack
 
         item = item_getter(id_)
         if item is None:
+            logger.warning(f"New item [{id_}] has vanished, skipping its insertion.")
+            stats.error()
             return None
         converted_item = converter(item)
         if converted_item is None:
+            stats.error()
             return None
-        new_id: ID = inserter(converted_item)
-
-        if insert_to_side == "A":
-            self._stats[0].create_new()
-        else:
-            self._stats[1].create_new()
+        new_id: Optional[ID] = inserter(converted_item)
+        if new_id is None:
+            stats.error()
+            return None
+        stats.create_new()
 
         return new_id
 
-    def _convert_n_update_to_A(self, id_A: ID, item: Item):
-        assert item is not None
-        converted_item = self._converter_to_A(item)
+    def _convert_n_update(self, pack: _UpdatePack, id_: ID, item: Item) -> bool:
+        """Return whether the item was updated - the caller is responsible for the stats."""
+        converter, updater = pack
+
+        # the item may have been deleted in the meantime - nothing to update it with
+        if item is None:
+            logger.warning(f"Source item of [{id_}] has vanished, skipping its update.")
+            return False
+        converted_item = converter(item)
         if converted_item is None:
-            return
+            return False
 
-        self._updater_to_A(id_A, converted_item)
-        self._stats[0].update()
+        return bool(updater(id_, converted_item))
 
-    def _convert_n_update_to_B(self, id_B: ID, item: Item):
-        assert item is not None
-        converted_item = self._converter_to_B(item)
-        if converted_item is None:
-            return
+    def _fetch_n_update(
+        self, pack: _UpdatePack, id_: ID, item_getter: ItemGetterFn, id_to_fetch: ID
+    ) -> bool:
+        return self._convert_n_update(pack, id_, item_getter(id_to_fetch))
+
+    @staticmethod
+    def _forget_deleted(map_: MutableBidict, id_: ID, stats: TypeStats):
+        map_.pop(id_, None)
+        stats.delete()
 
-        self._updater_to_B(id_B, converted_item)
-        self._stats[1].update()
+    @staticmethod
+    def _run_job(fn: Callable[..., Optional[bool]], args: tuple) -> "Future[Optional[bool]]":
+        """Run the given job in the calling thread and capture its outcome."""
+        future: "Future[Optional[bool]]" = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:  # pylint: disable="W0703"
+            future.set_exception(exc)
+        return future
+
+    def _run_jobs(self, jobs: List[_Job]):
+        """
+        Run the given jobs - concurrently if so configured - and apply their effects in the
+        calling thread.
+
+        All the jobs are run even if some of them raise. The effects of the ones that didn't
+        are applied before re-raising the first exception, so that the mapping keeps matching
+        the sides.
+        """
+        if self._max_workers > 1 and len(jobs) > 1:
+            with ThreadPoolExecutor(max_workers=min(self._max_workers, len(jobs))) as executor:
+                futures = [executor.submit(fn, *args) for fn, args, *_ in jobs]
+        else:
+            futures = [self._run_job(fn, args) for fn, args, *_ in jobs]
+
+        # all the futures are done at this point
+        first_exc: Optional[BaseException] = None
+        for (_, _, on_success, on_failure), future in zip(jobs, futures):
+            exc = future.exception()
+            if exc is not None:
+                if first_exc is None:
+                    first_exc = exc
+            elif future.result():
+                on_success()
+            else:
+                on_failure()
+
+        if first_exc is not None:
+            raise first_exc
 
     def sync(self, changes_A: SideChanges, changes_B: SideChanges):
         """
@@ -149,10 +229,15 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
         This is the main method you are supposed to call after the instance initialization to
         actually synchronize the two sides.
         """
+        # nothing changed on either side - typical for a polling loop, don't do any work
+        if not (changes_A or changes_B):
+            return
+
         try:
             return self._sync(changes_A=changes_A, changes_B=changes_B)
         finally:
-            logger.warning(f"\n\n{self._stats[0]}\n{self._stats[1]}")
+            if any(self._stats):
+                logger.warning(f"\n\n{self._stats[0]}\n{self._stats[1]}")
 
     def _sync_new_items(self, changes_A: SideChanges, changes_B: SideChanges):
         """
@@ -162,13 +247,12 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
         insert_to_side.
         """
         props = (
-            (self._A_to_B, changes_A.new, "B"),
-            (self._B_to_A, changes_B.new, "A"),
+            (self._A_to_B, changes_A.new, self._side_B_pack),
+            (self._B_to_A, changes_B.new, self._side_A_pack),
         )
-        for map_, new_changes, insert_to_side in props:
+        for map_, new_changes, pack in props:
             for id_ in new_changes:
-                insert_to_side = cast(Literal["A", "B"], insert_to_side)
-                inserted_id = self._convert_n_insert(id_, insert_to_side)
+                inserted_id = self._convert_n_insert(id_, pack)
                 if inserted_id is None:
                     continue
                 map_[id_] = inserted_id
@@ -178,11 +262,40 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
     ):  # pylint: disable="R0912,R0915,R0914"
         self._sync_new_items(changes_A=changes_A, changes_B=changes_B)
 
+        # bind everything used in the loops below to locals
+        B_to_A = self._B_to_A
+        A_to_B = self._A_to_B
+        get_A = self._item_getter_A
+        get_B = self._item_getter_B
+        del_A = self._deleter_to_A
+        del_B = self._deleter_to_B
+        update = self._convert_n_update
+        fetch_n_update = self._fetch_n_update
+        forget_deleted = self._forget_deleted
+        update_pack_A, update_pack_B = self._update_packs
+        stats_A, stats_B = self._stats
+        ID_A = ResolutionResult.ID.A
+        ID_Mix = ResolutionResult.ID.Mix
+        flags_A = changes_A.as_flags()
+        flags_B = changes_B.as_flags()
+
         # items modified on both sides --------------------------------------------------------
-        touched_from_B = changes_B.modified.union(changes_B.deleted)
-        touched_from_B_in_A_map = {self._B_to_A[change]: change for change in touched_from_B}
-        touched_from_A = changes_A.modified.union(changes_A.deleted)
-        touched_from_A_in_B_map = {self._A_to_B[change]: change for change in touched_from_A}
+        # classify the touched items in a single pass per side
+        a2b = A_to_B.__getitem__
+        b2a = B_to_A.__getitem__
+        touched_from_A_in_B_map: Dict[ID, ID] = {
+            a2b(id_A): id_A for id_A, flags in flags_A.items() if flags & TOUCHED
+        }
+
+        conflicts_in_B: List[ID] = []
+        not_conflicts_from_B: List[Tuple[ID, ID]] = []
+        for id_B, flags in flags_B.items():
+            if not flags & TOUCHED:
+                continue
+            if id_B in touched_from_A_in_B_map:
+                conflicts_in_B.append(id_B)
+            else:
+                not_conflicts_from_B.append((b2a(id_B), id_B))
 
         def format_conflict_id(conflict: ID) -> str:
             prefix_mod = "Modified from"
@@ -190,18 +303,18 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
 
             # find whether the A ID was deleted or modified
             conflict_in_A = touched_from_A_in_B_map[conflict]
-            if conflict_in_A in changes_A.deleted:
+            if flags_A[conflict_in_A] & DELETED:
                 a_str = f"{prefix_del} A"
-            elif conflict_in_A in changes_A.modified:
+            elif flags_A[conflict_in_A] & MODIFIED:
                 a_str = f"{prefix_mod} A"
             else:
                 logger.exception(
                     f"Programmatic Error regarding conflict ID [{conflict} / {conflict_in_A}]"
                 )
 
-            if conflict in changes_B.deleted:
+            if flags_B[conflict] & DELETED:
                 b_str = f"{prefix_del} B"
-            elif conflict in changes_B.modified:
+            elif flags_B[conflict] & MODIFIED:
                 b_str = f"{prefix_mod} B"
             else:
                 logger.exception(
@@ -211,65 +324,113 @@ class Synchronizer:  # pylint: disable="R0903,R0902"
             s = f"- [B] {conflict} / [A] {conflict_in_A}\n  {b_str}\n  {a_str}"  # type: ignore
             return s
 
-        conflicts_in_B = touched_from_B.intersection(touched_from_A_in_B_map)
-        if conflicts_in_B:
+        def format_conflicts() -> str:
             s = "\n\n"
             s += "Modified items on both sides:\n\n"
             s += "\n".join([format_conflict_id(conflict) for conflict in conflicts_in_B])
-            s += f"\n\nResolution strategy: {self._rs.__class__.__name__}"
-            logger.opt(lazy=True).debug(s)
-
-        for conflict_in_B in conflicts_in_B:
-            conflict_in_A = self._B_to_A[conflict_in_B]
+            s += f"\n\nResolution strategy: {self._rs.name}"
+            return s
 
-            # find the items in conflict
-            item_B = self._item_getter_B(conflict_in_B)
-            item_A = self._item_getter_A(conflict_in_A)
-            result = self._rs.resolve(item_A=item_A, item_B=item_B)
-            if result.result_id == ResolutionResult.ID.Mix:
+        # only format the conflicts if there's a sink that's going to show them
+        if conflicts_in_B:
+            logger.opt(lazy=True).debug("{}", format_conflicts)
+
+        # find the items in conflict and resolve them all at once
+        conflicts = [
+            (conflict_in_B, touched_from_A_in_B_map[conflict_in_B])
+            for conflict_in_B in conflicts_in_B
+        ]
+        items_A = [get_A(conflict_in_A) for _, conflict_in_A in conflicts]
+        items_B = [get_B(conflict_in_B) for conflict_in_B, _ in conflicts]
+        results = self._rs.resolve_batch(items_A, items_B)
+
+        for (conflict_in_B, conflict_in_A), item_A, item_B, result in zip(
+            conflicts, items_A, items_B, results
+        ):
+            result_id = result.result_id
+            if result_id == ID_Mix:
                 raise RuntimeError("Can't handle mixed results at the moment.")
-            elif result.result_id == ResolutionResult.ID.A:
+            elif result_id == ID_A:
                 if item_A is None:
-                    if conflict_in_B in changes_B.deleted:
+                    if flags_B[conflict_in_B] & DELETED:
                         # item already deleted - just remove it from the mapping
-                        self._B_to_A.pop(conflict_in_B)
+                        B_to_A.pop(conflict_in_B)
+                    elif del_B(conflict_in_B):
+                        forget_deleted(B_to_A, conflict_in_B, stats_B)
                     else:
-                        self._deleter_to_B(conflict_in_B)
-                        self._stats[1].delete()
+                        stats_B.error()
+                elif update(update_pack_B, conflict_in_B, item_A):
+                    stats_B.update()
                 else:
-                    self._convert_n_update_to_B(conflict_in_B, item_A)
+                    stats_B.error()
             else:
                 if item_B is None:
-                    if conflict_in_A in changes_A.deleted:
+                    if flags_A[conflict_in_A] & DELETED:
                         # item already deleted - just remove it from the mapping
-                        self._A_to_B.pop(conflict_in_A)
+                        A_to_B.pop(conflict_in_A)
+                    elif del_A(conflict_in_A):
+                        forget_deleted(A_to_B, conflict_in_A, stats_A)
                     else:
-                        self._deleter_to_A(conflict_in_A)
-                        self._stats[0].delete()
+                        stats_A.error()
+                elif update(update_pack_A, conflict_in_A, item_B):
+                    stats_A.update()
                 else:
-                    self._convert_n_update_to_A(conflict_in_A, item_B)
-
-        not_conflicts_from_B = touched_from_B.difference(touched_from_A_in_B_map)
-        not_conflicts_from_A = touched_from_A.difference(touched_from_B_in_A_map)
-
-        # delete and update at will
-        for id_B in not_conflicts_from_B:
-            id_A = self._B_to_A[id_B]
-            if id_B in changes_B.modified:
-                item_B = self._item_getter_B(id_B)
-                self._convert_n_update_to_A(id_A, item_B)
-            elif id_B in changes_B.deleted:
-                self._deleter_to_A(id_A)
-                self._stats[0].delete()
+                    stats_A.error()
+
+        # the ID correspondences are already known from the map above - don't look them up
+        # again in the bidicts
+        not_conflicts_from_A = [
+            (id_A, id_B)
+            for id_B, id_A in touched_from_A_in_B_map.items()
+            if not flags_B.get(id_B, 0) & TOUCHED
+        ]
+
+        # delete and update at will. These jobs only call out to the two sides, so they may
+        # run concurrently - the mapping and the stats are only updated from this thread.
+        jobs: List[_Job] = []
+        for id_A, id_B in not_conflicts_from_B:
+            flags = flags_B[id_B]
+            if flags & MODIFIED:
+                jobs.append(
+                    (
+                        fetch_n_update,
+                        (update_pack_A, id_A, get_B, id_B),
+                        stats_A.update,
+                        stats_A.error,
+                    )
+                )
+            elif flags & DELETED:
+                jobs.append(
+                    (
+                        del_A,
+                        (id_A,),
+                        partial(forget_deleted, A_to_B, id_A, stats_A),
+                        stats_A.error,
+                    )
+                )
             else:
                 raise RuntimeError("Programmatic Error")
-        for id_A in not_conflicts_from_A:
-            id_B = self._A_to_B[id_A]
-            if id_A in changes_A.modified:
-                item_A = self._item_getter_A(id_A)
-                self._convert_n_update_to_B(id_B, item_A)
-            elif id_A in changes_A.deleted:
-                self._deleter_to_B(id_B)
-                self._stats[1].delete()
+        for id_A, id_B in not_conflicts_from_A:
+            flags = flags_A[id_A]
+            if flags & MODIFIED:
+                jobs.append(
+                    (
+                        fetch_n_update,
+                        (update_pack_B, id_B, get_A, id_A),
+                        stats_B.update,
+                        stats_B.error,
+                    )
+                )
+            elif flags & DELETED:
+                jobs.append(
+                    (
+                        del_B,
+                        (id_B,),
+                        partial(forget_deleted, B_to_A, id_B, stats_B),
+                        stats_B.error,
+                    )
+                )
             else:
                 raise RuntimeError("Programmatic Error")
+
+        self._run_jobs(jobs)
@@ -89,3 +89,37 @@ def test_names():
         LeastRecentRS(date_getter_A=item_getter, date_getter_B=item_getter).name
         == "LeastRecentRS"
     )
+
+
+def test_resolve_batch():
+    items_A = [sample_items[0], sample_items[3], None, sample_items[1]]
+    items_B = [sample_items[1], sample_items[2], sample_items[2], None]
+    for rs in (
+        MostRecentRS(date_getter_A=item_getter, date_getter_B=item_getter),
+        LeastRecentRS(date_getter_A=item_getter, date_getter_B=item_getter),
+        AlwaysFirstRS(),
+        AlwaysSecondRS(),
+    ):
+        resolutions = rs.resolve_batch(items_A, items_B)
+        expected = [rs.resolve(item_A, item_B) for item_A, item_B in zip(items_A, items_B)]
+        assert [r.result_id for r in resolutions] == [r.result_id for r in expected]
+        assert [r.item for r in resolutions] == [r.item for r in expected]
+
+
+def test_resolve_batch_uses_overridden_resolve():
+    class AlwaysBRS(MostRecentRS):
+        def resolve(self, item_A, item_B):
+            return ResolutionResult(id=ResolutionResult.ID.B, item=item_B)
+
+    rs = AlwaysBRS(date_getter_A=item_getter, date_getter_B=item_getter)
+    resolutions = rs.resolve_batch([sample_items[3]], [sample_items[0]])
+    assert [r.result_id for r in resolutions] == [ResolutionResult.ID.B]
+
+
+def test_names_of_custom_strategies():
+    class CustomRS(AlwaysFirstRS):
+        pass
+
+    assert CustomRS.name == "CustomRS"
+    assert CustomRS().name == "CustomRS"
+    assert AlwaysFirstRS.name == "AlwaysFirstRS"
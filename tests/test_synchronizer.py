@@ -1,6 +1,8 @@
+import itertools
+import sys
 from dataclasses import dataclass
-from functools import total_ordering
-from typing import List, MutableMapping
+from functools import partial
+from typing import Dict, Iterable, List, MutableMapping, Optional, Set, Type, TypeVar
 
 import pytest
 from bidict import MutableBidict, bidict  # type: ignore
@@ -15,82 +17,102 @@ from item_synchronizer.resolution_strategy import (
 from item_synchronizer.types import ID
 
 
-@total_ordering
-@dataclass
+@dataclass(frozen=True)
 class Item:
+    # dataclass(slots=True) needs python 3.10
+    __slots__ = ("val", "_hash")
+
     val: str
 
+    def __post_init__(self):
+        # interned values make most equality checks a pointer comparison
+        object.__setattr__(self, "val", sys.intern(self.val))
+        object.__setattr__(self, "_hash", hash(self.val))
+
     def __eq__(self, other):
-        return self.val == other.val
+        return self.val is other.val or self.val == other.val
 
     def __lt__(self, other):
         return self.val < other.val
 
+    def __hash__(self):
+        return self._hash
+
 
 class ItemA(Item):
-    pass
+    __slots__ = ()
 
 
 class ItemB(Item):
-    pass
+    __slots__ = ()
 
 
 ItemStoreA = MutableMapping[str, ItemA]
 ItemStoreB = MutableMapping[str, ItemB]
 
+_ItemT = TypeVar("_ItemT", bound=Item)
 
-def create_synchronizer(
-    store_A: ItemStoreA,
-    store_B: ItemStoreB,
-    resolution_strategy: ResolutionStrategy = AlwaysFirstRS(),
-    deleted_ids: List[ID] = [],
-):
-    def A_inserter(item: ItemA) -> ID:
-        store_A[item.val] = item
-        return str(item)
 
-    def B_inserter(item: ItemB) -> ID:
-        store_B[item.val] = item
-        return str(item)
+def _store(cls: Type[_ItemT], ids: Iterable[int]) -> Dict[str, _ItemT]:
+    keys = [str(i) for i in ids]
+    return dict(zip(keys, map(cls, keys)))
+
+
+# IDs shared across the SideChanges of the various tests - SideChanges keeps the sets it's
+# given, so each test passes its own copy
+_IDS_1_5 = frozenset({"1", "2", "3", "4", "5"})
+_COMMON_MODIFIED_RANGE = range(2, 12)
+_IDS_COMMON_MODIFIED = frozenset(str(i) for i in _COMMON_MODIFIED_RANGE)
+_IDS_COMMON_DELETED = frozenset({"5", "6", "7"})
+
 
-    def A_updater(id_: ID, item: ItemA):
-        store_A[id_] = item
+def _insert(store: MutableMapping[str, _ItemT], item: _ItemT) -> ID:
+    store[item.val] = item
+    return str(item)
 
-    def B_updater(id_: ID, item: ItemB):
-        store_B[id_] = item
 
-    def A_deleter(id_: ID):
-        del store_A[id_]
+def _update(store: MutableMapping[str, _ItemT], id_: ID, item: _ItemT):
+    store[id_] = item
 
-    def B_deleter(id_: ID):
-        del store_B[id_]
 
-    def A_item_getter(id_: ID) -> Item:
-        return store_A[id_]
+def _delete(store: MutableMapping[str, _ItemT], id_: ID):
+    del store[id_]
 
-    def B_item_getter(id_: ID) -> Item:
-        return store_B[id_]
 
-    # create correspondences
-    bidict_: MutableBidict = bidict()
+def _get(store: MutableMapping[str, _ItemT], id_: ID) -> _ItemT:
+    return store[id_]
+
+
+def create_synchronizer(
+    store_A: ItemStoreA,
+    store_B: ItemStoreB,
+    resolution_strategy: ResolutionStrategy = AlwaysFirstRS(),
+    deleted_ids: Optional[List[ID]] = None,
+    max_workers: int = 1,
+    catch_exceptions: bool = False,
+):
+    if deleted_ids is None:
+        deleted_ids = []
 
-    # the A<->B mapping should still contain entries for deleted items
-    for id_ in list(store_A.keys()) + list(store_B.keys()) + deleted_ids:
-        bidict_[str(id_)] = str(id_)
+    # create correspondences - the A<->B mapping should still contain entries for deleted items
+    keys = itertools.chain(store_A, store_B, deleted_ids)
+    bidict_: MutableBidict = bidict((key, key) for key in keys)
 
     s = Synchronizer(
         A_to_B=bidict_,
-        inserter_to_A=A_inserter,
-        inserter_to_B=B_inserter,
-        updater_to_A=A_updater,
-        updater_to_B=B_updater,
-        deleter_to_A=A_deleter,
-        deleter_to_B=B_deleter,
+        inserter_to_A=partial(_insert, store_A),
+        inserter_to_B=partial(_insert, store_B),
+        updater_to_A=partial(_update, store_A),
+        updater_to_B=partial(_update, store_B),
+        deleter_to_A=partial(_delete, store_A),
+        deleter_to_B=partial(_delete, store_B),
         converter_to_A=lambda item_B: ItemA(item_B.val),
         converter_to_B=lambda item_A: ItemB(item_A.val),
-        item_getter_A=A_item_getter,
-        item_getter_B=B_item_getter,
+        item_getter_A=partial(_get, store_A),
+        item_getter_B=partial(_get, store_B),
         resolution_strategy=resolution_strategy,  # type: ignore
+        catch_exceptions=catch_exceptions,
+        max_workers=max_workers,
     )
 
     return s
@@ -109,12 +131,13 @@ def run_sync_n_compare(
     assert len(store_A) == len(store_B)
     assert store_A == store_B
     assert len(store_A) == len(args)
-    assert sorted(store_A.keys()) == sorted([str(i) for i in args])
-    assert sorted(store_A.values()) == sorted([ItemA(str(i)) for i in args])
+    expected_keys = {str(i) for i in args}
+    assert store_A.keys() == expected_keys
+    assert sorted(store_A.values()) == sorted(ItemA(k) for k in expected_keys)
 
 
 def test_new_items_from_both_empty_both():
-    changes_A = SideChanges(new={"1", "2", "3", "4", "5"})
+    changes_A = SideChanges(new=set(_IDS_1_5))
     changes_B = SideChanges(new={"10", "20", "30", "40", "50"})
     store_A = {id_: ItemA(id_) for id_ in changes_A.new}
     store_B = {id_: ItemB(id_) for id_ in changes_B.new}
@@ -134,16 +157,16 @@ def test_new_items_from_both_empty_both():
 def test_new_items_from_A():
     changes_A = SideChanges(new={"3", "4", "5"})
     changes_B = SideChanges(new=set())
-    store_A = {str(id_): ItemA(str(id_)) for id_ in [1, 2, 3, 4, 5]}
-    store_B = {str(id_): ItemB(str(id_)) for id_ in [1, 2]}
+    store_A = _store(ItemA, [1, 2, 3, 4, 5])
+    store_B = _store(ItemB, [1, 2])
     synchronizer = create_synchronizer(store_A, store_B)
     run_sync_n_compare(synchronizer, store_A, store_B, changes_A, changes_B, [1, 2, 3, 4, 5])
 
 
 def test_new_items_from_A_empty_B():
-    changes_A = SideChanges(new={"1", "2", "3", "4", "5"})
+    changes_A = SideChanges(new=set(_IDS_1_5))
     changes_B = SideChanges(new=set())
-    store_A = {str(id_): ItemA(str(id_)) for id_ in [1, 2, 3, 4, 5]}
+    store_A = _store(ItemA, [1, 2, 3, 4, 5])
     store_B = {}
     synchronizer = create_synchronizer(store_A, store_B)
     run_sync_n_compare(synchronizer, store_A, store_B, changes_A, changes_B, [1, 2, 3, 4, 5])
@@ -151,17 +174,17 @@ def test_new_items_from_A_empty_B():
 
 def test_new_items_from_B_empty_A():
     changes_A = SideChanges(new=set())
-    changes_B = SideChanges(new={"1", "2", "3", "4", "5"})
+    changes_B = SideChanges(new=set(_IDS_1_5))
     store_A = {}
-    store_B = {str(id_): ItemB(str(id_)) for id_ in [1, 2, 3, 4, 5]}
+    store_B = _store(ItemB, [1, 2, 3, 4, 5])
     synchronizer = create_synchronizer(store_A, store_B)
     run_sync_n_compare(synchronizer, store_A, store_B, changes_A, changes_B, [1, 2, 3, 4, 5])
 
 
 def test_modified_items_from_A():
-    changes_A = SideChanges(new=set(), modified={"1", "2", "3", "4", "5"})
+    changes_A = SideChanges(new=set(), modified=set(_IDS_1_5))
     changes_B = SideChanges()
-    store_A = {str(id_): ItemA(str(id_)) for id_ in [1, 2, 3, 4, 5]}
+    store_A = _store(ItemA, [1, 2, 3, 4, 5])
     store_B = {str(id_): ItemB(f"old_{id_}") for id_ in [1, 2, 3, 4, 5]}
 
     synchronizer = create_synchronizer(store_A, store_B)
@@ -177,8 +200,8 @@ def test_modified_items_from_A():
 def test_deleted_items_from_A():
     changes_A = SideChanges(new=set(), deleted={"1", "2", "3"})
     changes_B = SideChanges()
-    store_A = {str(id_): ItemA(str(id_)) for id_ in [4, 5]}
-    store_B = {str(id_): ItemB(str(id_)) for id_ in [1, 2, 3, 4, 5]}
+    store_A = _store(ItemA, [4, 5])
+    store_B = _store(ItemB, [1, 2, 3, 4, 5])
     synchronizer = create_synchronizer(store_A, store_B, deleted_ids=["1", "2", "3"])
     run_sync_n_compare(synchronizer, store_A, store_B, changes_A, changes_B, [4, 5])
 
@@ -186,12 +209,20 @@ def test_deleted_items_from_A():
 def test_deleted_items_from_B():
     changes_A = SideChanges()
     changes_B = SideChanges(deleted={"2"})
-    store_A = {str(id_): ItemA(str(id_)) for id_ in [1, 2, 3, 4, 5]}
-    store_B = {str(id_): ItemB(str(id_)) for id_ in [1, 3, 4, 5]}
+    store_A = _store(ItemA, [1, 2, 3, 4, 5])
+    store_B = _store(ItemB, [1, 3, 4, 5])
     synchronizer = create_synchronizer(store_A, store_B, deleted_ids=["2"])
     run_sync_n_compare(synchronizer, store_A, store_B, changes_A, changes_B, [1, 3, 4, 5])
 
 
+_MODIFIED_FROM_A_DELETED_FROM_B_STORE_A = _store(ItemA, [1, 2, 3, 4, 5])
+_MODIFIED_FROM_A_DELETED_FROM_B_STORE_B = {
+    "1": ItemB("1"),
+    "4": ItemB("old_4"),
+    "5": ItemB("5"),
+}
+
+
 @pytest.mark.parametrize(
     "resolution_strategy,results",
     [(AlwaysFirstRS(), [1, 3, 4, 5]), (AlwaysSecondRS(), [1, 4, 5])],
@@ -201,12 +232,8 @@ def test_modified_from_A_deleted_from_B(
 ):
     changes_A = SideChanges(new=set(), modified={"3", "4"})
     changes_B = SideChanges(new=set(), deleted={"2", "3"})
-    store_A = {str(id_): ItemA(str(id_)) for id_ in [1, 2, 3, 4, 5]}
-    store_B = {
-        "1": ItemB("1"),
-        "4": ItemB("old_4"),
-        "5": ItemB("5"),
-    }
+    store_A = dict(_MODIFIED_FROM_A_DELETED_FROM_B_STORE_A)
+    store_B = dict(_MODIFIED_FROM_A_DELETED_FROM_B_STORE_B)
     if resolution_strategy == AlwaysFirstRS:
         store_B["3"] = ItemB("old_3")
 
@@ -221,22 +248,18 @@ def test_modified_from_A_deleted_from_B(
     [(AlwaysFirstRS(), "A"), (AlwaysSecondRS(), "B")],
 )
 def test_modified_from_A_modified_from_B(resolution_strategy: ResolutionStrategy, suffix: str):
-    common_modified_range = range(2, 12)
+    common_modified_range = _COMMON_MODIFIED_RANGE
     full_range = range(1, 13)
-    changes_A = SideChanges(
-        new=set(), modified={"1", *[str(i) for i in common_modified_range]}
-    )
-    changes_B = SideChanges(
-        new=set(), modified={*[str(i) for i in common_modified_range], "12"}
-    )
+    changes_A = SideChanges(new=set(), modified={*_IDS_COMMON_MODIFIED, "1"})
+    changes_B = SideChanges(new=set(), modified={*_IDS_COMMON_MODIFIED, "12"})
 
     # 1 is always going to be from A
     # 12 is always going to be from B
     # 2->11 depends on the parameter of the test
-    store_A = {str(i): ItemA(str(i)) for i in full_range}
+    store_A = _store(ItemA, full_range)
     store_A = {"1": ItemA("1_modified_by_A")}
     store_A.update({str(i): ItemA(f"{i}_modified_by_A") for i in common_modified_range})
-    store_B = {str(i): ItemB(str(i)) for i in full_range}
+    store_B = _store(ItemB, full_range)
     store_B = {"12": ItemB("12_modified_by_B")}
     store_B.update({str(i): ItemB(f"{i}_modified_by_B") for i in common_modified_range})
 
@@ -246,7 +269,7 @@ def test_modified_from_A_modified_from_B(resolution_strategy: ResolutionStrategy
         resolution_strategy=resolution_strategy,
     )
 
-    expected_A_results = {str(i): ItemA(str(i)) for i in full_range}
+    expected_A_results = _store(ItemA, full_range)
     expected_A_results["1"] = ItemA("1_modified_by_A")
     expected_A_results["12"] = ItemA("12_modified_by_B")
     expected_A_results.update(
@@ -257,24 +280,27 @@ def test_modified_from_A_modified_from_B(resolution_strategy: ResolutionStrategy
     synchronizer.sync(changes_A, changes_B)
     assert len(store_A) == len(store_B)
     assert store_A == store_B
-    assert sorted(store_A.keys()) == sorted(expected_A_results.keys())
+    assert store_A.keys() == expected_A_results.keys()
     assert sorted(store_A.values()) == sorted(expected_A_results.values())
 
 
+_DELETED_FROM_A_DELETED_FROM_B_STORE_A = _store(ItemA, [1, 2, 3, 8, 9, 10])
+_DELETED_FROM_A_DELETED_FROM_B_STORE_B = _store(ItemB, [1, 2, 3, 4, 9, 10])
+
+
 @pytest.mark.parametrize(
     "resolution_strategy",
     [AlwaysFirstRS(), AlwaysSecondRS()],
 )
 def test_deleted_from_A_deleted_from_B(resolution_strategy):
-    common_deleted_range = [5, 6, 7]
-    changes_A = SideChanges(new=set(), deleted={"4", *[str(i) for i in common_deleted_range]})
-    changes_B = SideChanges(new=set(), deleted={*[str(i) for i in common_deleted_range], "8"})
+    changes_A = SideChanges(new=set(), deleted={*_IDS_COMMON_DELETED, "4"})
+    changes_B = SideChanges(new=set(), deleted={*_IDS_COMMON_DELETED, "8"})
 
     # 4 is deleted from A
     # 8 is deleted from B
     # 5, 6, 7 deleted from both
-    store_A = {str(i): ItemA(str(i)) for i in [1, 2, 3, 8, 9, 10]}
-    store_B = {str(i): ItemB(str(i)) for i in [1, 2, 3, 4, 9, 10]}
+    store_A = dict(_DELETED_FROM_A_DELETED_FROM_B_STORE_A)
+    store_B = dict(_DELETED_FROM_A_DELETED_FROM_B_STORE_B)
 
     synchronizer = create_synchronizer(
         store_A,
@@ -283,16 +309,120 @@ def test_deleted_from_A_deleted_from_B(resolution_strategy):
         deleted_ids=["4", "5", "6", "7", "8"],
     )
 
-    expected_A_results = {str(i): ItemA(str(i)) for i in [1, 2, 3, 9, 10]}
+    expected_A_results = _store(ItemA, [1, 2, 3, 9, 10])
 
     assert store_A != store_B
     synchronizer.sync(changes_A, changes_B)
     assert len(store_A) == len(store_B)
     assert store_A == store_B
-    assert sorted(store_A.keys()) == sorted(expected_A_results.keys())
+    assert store_A.keys() == expected_A_results.keys()
     assert sorted(store_A.values()) == sorted(expected_A_results.values())
 
 
+def test_no_changes():
+    store_A = _store(ItemA, [1, 2, 3])
+    store_B = _store(ItemB, [1, 2, 3])
+    synchronizer = create_synchronizer(store_A, store_B)
+    synchronizer.sync(SideChanges(), SideChanges())
+    assert store_A == store_B
+    assert sorted(store_A.keys()) == ["1", "2", "3"]
+
+
+def test_concurrent_updates_and_deletions():
+    changes_A = SideChanges(modified={str(id_) for id_ in range(1, 11)})
+    changes_B = SideChanges(deleted={str(id_) for id_ in range(11, 21)})
+    store_A = _store(ItemA, range(1, 21))
+    store_B = {str(id_): ItemB(f"old_{id_}") for id_ in range(1, 11)}
+    synchronizer = create_synchronizer(
+        store_A, store_B, deleted_ids=[str(id_) for id_ in range(11, 21)], max_workers=4
+    )
+    run_sync_n_compare(
+        synchronizer, store_A, store_B, changes_A, changes_B, list(range(1, 11))
+    )
+    assert synchronizer._A_to_B == {str(id_): str(id_) for id_ in range(1, 11)}
+
+
+class _FailingStore(dict):
+    """Store whose updates and deletions of the given IDs fail."""
+
+    def __init__(self, *args, failing_ids: Set[ID], **kargs):
+        super().__init__(*args, **kargs)
+        self._failing_ids = failing_ids
+
+    def __setitem__(self, key, value):
+        if key in self._failing_ids:
+            raise RuntimeError(f"Failed to update {key}")
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if key in self._failing_ids:
+            raise RuntimeError(f"Failed to delete {key}")
+        super().__delitem__(key)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_mapping_kept_in_sync_on_failed_deletion(max_workers: int):
+    store_A: Dict[str, ItemA] = {}
+    store_B = _FailingStore(_store(ItemB, range(1, 9)), failing_ids={"4"})
+    synchronizer = create_synchronizer(
+        store_A,
+        store_B,
+        deleted_ids=[str(id_) for id_ in range(1, 9)],
+        max_workers=max_workers,
+    )
+
+    with pytest.raises(RuntimeError):
+        synchronizer.sync(
+            SideChanges(deleted={str(id_) for id_ in range(1, 9)}), SideChanges()
+        )
+
+    # the deletions that did succeed should be reflected in the mapping
+    assert "4" in store_B
+    assert set(synchronizer._A_to_B) == set(store_B)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_failed_operations_counted_as_errors(max_workers: int):
+    store_A = _store(ItemA, range(1, 4))
+    store_B = _FailingStore(
+        {str(id_): ItemB(f"old_{id_}") for id_ in range(1, 5)}, failing_ids={"2", "4"}
+    )
+    synchronizer = create_synchronizer(
+        store_A,
+        store_B,
+        deleted_ids=["4"],
+        max_workers=max_workers,
+        catch_exceptions=True,
+    )
+    synchronizer.sync(SideChanges(modified={"1", "2", "3"}, deleted={"4"}), SideChanges())
+
+    assert store_B == {
+        "1": ItemB("1"),
+        "2": ItemB("old_2"),
+        "3": ItemB("3"),
+        "4": ItemB("old_4"),
+    }
+    assert "4" in synchronizer._A_to_B
+    stats_B = synchronizer._stats[1]
+    assert (stats_B._updated, stats_B._deleted, stats_B._errors) == (2, 0, 2)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_vanished_modified_item(max_workers: int):
+    # item 2 is reported modified on A but is gone by the time it's fetched
+    store_A = _store(ItemA, [1, 3])
+    store_B = {str(id_): ItemB(f"old_{id_}") for id_ in range(1, 4)}
+    synchronizer = create_synchronizer(
+        store_A, store_B, deleted_ids=["2"], max_workers=max_workers
+    )
+    synchronizer.sync(SideChanges(modified={"1", "2", "3"}), SideChanges())
+
+    assert store_B == {"1": ItemB("1"), "2": ItemB("old_2"), "3": ItemB("3")}
+    stats_B = synchronizer._stats[1]
+    assert (stats_B._updated, stats_B._errors) == (2, 1)
+    assert "Items with errors: 1" in str(stats_B)
+
+
 @pytest.mark.skip()
 def test_multiple_syncs():
     pass